@@ -1,32 +1,26 @@
 import pandas as pd
 import numpy as np
 import pickle
-import re
 
-# 1. Load dữ liệu gốc
+from dataset import load_rootdata
+
+# 1. Load dữ liệu gốc (đã làm sạch, qua cache Arrow của dataset.py)
 # Lưu ý: Đảm bảo file rootdata.csv nằm cùng thư mục với file code này
 try:
-    df = pd.read_csv('rootdata.csv', encoding='latin1')
+    df = load_rootdata('rootdata.csv')
     print(f"Đã load dữ liệu: {df.shape}")
 except FileNotFoundError:
     print("❌ Lỗi: Không tìm thấy file 'rootdata.csv'. Hãy kiểm tra lại tên file.")
     exit()
 
-# 2. Hàm làm sạch giá tiền (Target)
-def clean_usa_price(price_str):
-    if pd.isna(price_str):
-        return np.nan
-    # Xóa ký tự tiền tệ và dấu phẩy
-    price_str = str(price_str).replace("USD", "").replace("$", "").replace(",", "").strip()
-    try:
-        value = float(price_str)
-        # Lọc nhiễu: Giá quá thấp (<99) hoặc quá cao (>2000) coi như lỗi (theo logic cũ)
-        if 99 <= value <= 2000:
-            return value
-        else:
-            return np.nan
-    except:
+# 2. Hàm lọc giá tiền (Target) - "USD 1,099" đã được dataset.py đổi thành 1099.0
+def clean_usa_price(value):
+    if pd.isna(value):
         return np.nan
+    # Lọc nhiễu: Giá quá thấp (<99) hoặc quá cao (>2000) coi như lỗi (theo logic cũ)
+    if 99 <= value <= 2000:
+        return value
+    return np.nan
 
 # 3. Áp dụng làm sạch và tính toán
 print("Đang xử lý dữ liệu...")
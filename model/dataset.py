@@ -0,0 +1,243 @@
+"""
+Data layer dùng chung cho map builder, training và các tool chấm điểm hàng loạt.
+
+rootdata.csv được làm sạch 1 lần (giống notebook mobile-price-prediction-with-ml.ipynb:
+"174g" -> 174.0, "3,600mAh" -> 3600.0, "USD 799" -> 799.0, ROM lấy từ Model Name)
+rồi lưu thành file Arrow IPC trong model/.cache/, đặt tên theo SHA-256 của file CSV
+gốc (+ cleaner, encoding). Các lần load sau chỉ memory-map file cache, không parse lại CSV.
+Nếu CSV thay đổi thì hash đổi => cache tự được tạo lại.
+
+Cách dùng:
+    from dataset import load_rootdata, load_training_data
+    df = load_rootdata()           # rootdata.csv đã làm sạch, có kiểu dữ liệu
+    data = load_training_data()    # dataAfterpreprocess.csv (13 features + target)
+
+Benchmark so với parse CSV:
+    python dataset.py bench
+"""
+
+from typing import Callable, Optional
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow là optional: không có thì luôn parse CSV
+    pa = None
+    feather = None
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOTDATA_PATH = os.path.join(MODEL_DIR, "rootdata.csv")
+TRAINING_DATA_PATH = os.path.join(MODEL_DIR, "dataAfterpreprocess.csv")
+CACHE_DIR = os.path.join(MODEL_DIR, ".cache")
+
+# Tăng khi đổi logic làm sạch để bỏ các cache cũ
+CACHE_VERSION = 1
+
+FEATURE_COLUMNS = [
+    'RAM', 'Front Camera', 'Back Camera', 'Battery Capacity', 'Screen Size', 'ROM',
+    'Company_Apple', 'Company_Honor', 'Company_Oppo', 'Company_Other', 'Company_Samsung', 'Company_Vivo',
+    'Processor_Avg_Price_Scaled'
+]
+TARGET_COLUMN = 'Launched Price (USA)'
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ============================================
+# CLEANING (rootdata.csv)
+# ============================================
+def clean_numeric(series: pd.Series, remove_str: str = "") -> pd.Series:
+    """Lấy số đầu tiên trong chuỗi: "3,600mAh" -> 3600.0, "48MP + 12MP" -> 48.0."""
+    cleaned = (
+        series.astype(str)
+        .str.replace(remove_str, "", regex=False)
+        .str.replace("Not available", "", regex=False)
+        .str.replace(",", "", regex=False)
+        .str.extract(r"(\d+\.?\d*)")[0]
+    )
+    return pd.to_numeric(cleaned, errors="coerce").astype("float64")
+
+
+def extract_rom(model_name) -> float:
+    """ROM (TB) từ tên model: "iPhone 16 256GB" -> 0.25, "... 1TB" -> 1.0."""
+    model_name = str(model_name).upper()
+    match_tb = re.search(r'(\d+)TB', model_name)
+    if match_tb:
+        return float(match_tb.group(1))
+    match_gb = re.search(r'(\d+)GB', model_name)
+    if match_gb:
+        return float(match_gb.group(1)) / 1024
+    return np.nan
+
+
+def clean_rootdata(raw: pd.DataFrame) -> pd.DataFrame:
+    """Chuyển rootdata.csv (toàn chuỗi) thành bảng có kiểu. Giá trị không đọc được -> NaN."""
+    df = pd.DataFrame({
+        'Company Name': raw['Company Name'].astype(str).str.strip(),
+        'Model Name': raw['Model Name'].astype(str).str.strip(),
+        'Mobile Weight': clean_numeric(raw['Mobile Weight'], remove_str="g"),
+        'RAM': clean_numeric(raw['RAM'], remove_str="GB"),
+        'Front Camera': clean_numeric(raw['Front Camera'], remove_str="MP"),
+        'Back Camera': clean_numeric(raw['Back Camera'], remove_str="MP"),
+        'Processor': raw['Processor'].astype(str).str.strip(),
+        'Battery Capacity': clean_numeric(raw['Battery Capacity'], remove_str="mAh"),
+        'Screen Size': clean_numeric(raw['Screen Size'], remove_str="inches"),
+        'Launched Price (USA)': clean_numeric(raw['Launched Price (USA)'], remove_str="USD"),
+        'Launched Year': pd.to_numeric(raw['Launched Year'], errors="coerce").astype("Int64"),
+    })
+    df['ROM'] = raw['Model Name'].map(extract_rom).astype("float64")
+    return df
+
+
+# ============================================
+# CACHE
+# ============================================
+def _cache_variant(cleaner: Optional[Callable], encoding: Optional[str]) -> str:
+    """Hash ngắn của cách parse (cleaner + encoding): cùng 1 CSV có thể có nhiều bản cache khác nhau."""
+    cleaner_name = "raw"
+    if cleaner is not None:
+        module = cleaner.__module__
+        if module == "__main__":
+            # Chạy trực tiếp (python dataset.py ...) => dùng tên file để key giống khi import
+            module = os.path.splitext(os.path.basename(getattr(sys.modules["__main__"], "__file__", module)))[0]
+        cleaner_name = f"{module}.{cleaner.__qualname__}"
+    payload = f"{cleaner_name}|{encoding or 'default'}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:8]
+
+
+def _cache_pattern(stem: str, variant: str):
+    # <stem>-<variant 8 hex>-<csv hash 16 hex>-v<version>.arrow
+    return re.compile(rf"^{re.escape(stem)}-{variant}-[0-9a-f]{{16}}-v\d+\.arrow$")
+
+
+def _cache_path(source_path: str, digest: str, variant: str) -> str:
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(CACHE_DIR, f"{stem}-{variant}-{digest[:16]}-v{CACHE_VERSION}.arrow")
+
+
+def _read_arrow(path: str) -> pd.DataFrame:
+    # memory_map: dữ liệu cột được đọc thẳng từ page cache, không copy/parse
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+
+def _write_arrow(df: pd.DataFrame, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    # Không nén để có thể memory-map trực tiếp
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    # Xóa cache cũ (CSV phiên bản trước / CACHE_VERSION cũ) của cùng file nguồn + cách parse
+    stem, variant = os.path.basename(path).rsplit("-", 3)[:2]
+    pattern = _cache_pattern(stem, variant)
+    cache_dir = os.path.dirname(path)
+    for name in os.listdir(cache_dir):
+        if pattern.match(name) and os.path.join(cache_dir, name) != path:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+
+def load_cached_csv(csv_path: str, cleaner: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                    encoding: Optional[str] = None, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Load CSV qua cache Arrow IPC. Key = SHA-256 của file CSV + tên cleaner + encoding.
+    `cleaner` chạy 1 lần trước khi cache.
+    """
+    if not use_cache or pa is None:
+        raw = pd.read_csv(csv_path, encoding=encoding)
+        return cleaner(raw) if cleaner else raw
+
+    cache_path = _cache_path(csv_path, file_sha256(csv_path), _cache_variant(cleaner, encoding))
+    if os.path.exists(cache_path):
+        try:
+            return _read_arrow(cache_path)
+        except Exception as e:
+            print(f"⚠️ Cache {cache_path} unreadable ({e}), rebuilding")
+
+    raw = pd.read_csv(csv_path, encoding=encoding)
+    df = cleaner(raw) if cleaner else raw
+    try:
+        _write_arrow(df, cache_path)
+    except Exception as e:
+        print(f"⚠️ Failed to write cache {cache_path}: {e}")
+    return df
+
+
+def load_rootdata(path: str = ROOTDATA_PATH, use_cache: bool = True) -> pd.DataFrame:
+    """rootdata.csv đã làm sạch (xem clean_rootdata)."""
+    return load_cached_csv(path, cleaner=clean_rootdata, encoding="latin1", use_cache=use_cache)
+
+
+def load_training_data(path: str = TRAINING_DATA_PATH, use_cache: bool = True) -> pd.DataFrame:
+    """dataAfterpreprocess.csv: FEATURE_COLUMNS + TARGET_COLUMN."""
+    data = load_cached_csv(path, use_cache=use_cache)
+    missing_cols = [col for col in FEATURE_COLUMNS + [TARGET_COLUMN] if col not in data.columns]
+    if missing_cols:
+        raise ValueError(f"File thiếu các cột sau: {missing_cols}")
+    return data
+
+
+def load_xy(path: str = TRAINING_DATA_PATH, use_cache: bool = True):
+    """(X, y) theo đúng thứ tự feature lúc train."""
+    data = load_training_data(path, use_cache=use_cache)
+    return data[FEATURE_COLUMNS], data[TARGET_COLUMN]
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+def _bench(repeat: int = 20):
+    if pa is None:
+        print("❌ pyarrow is not installed, nothing to compare")
+        return
+
+    def timeit(fn):
+        fn()  # warm-up (tạo cache / page cache)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat * 1000.0
+
+    cases = [
+        ("rootdata.csv (parse + clean)", lambda: load_rootdata(use_cache=False)),
+        ("rootdata cache (mmap)", lambda: load_rootdata()),
+        ("dataAfterpreprocess.csv (parse)", lambda: load_training_data(use_cache=False)),
+        ("dataAfterpreprocess cache (mmap)", lambda: load_training_data()),
+    ]
+    print(f"\n{'='*60}")
+    print(f"⏱️ LOAD BENCHMARK (mean of {repeat} runs)")
+    for name, fn in cases:
+        print(f"  {name:<36}{timeit(fn):>10.2f} ms")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cached dataset loader")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="Build the columnar caches")
+    sub.add_parser("bench", help="Compare cached loads with CSV parsing")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(f"✅ rootdata: {load_rootdata().shape}")
+        print(f"✅ training data: {load_training_data().shape}")
+    elif args.command == "bench":
+        _bench()
@@ -0,0 +1,338 @@
+"""
+Tìm hyperparameter cho Random Forest bằng successive halving + cross-validation.
+
+- Resource của successive halving là số cây: mọi cấu hình bắt đầu với --min-trees cây,
+  sau mỗi vòng chỉ giữ lại 1/eta cấu hình tốt nhất và nhân số cây lên eta lần.
+- Rừng được "nuôi" tiếp bằng warm_start (chỉ train thêm cây mới) thay vì fit lại từ đầu;
+  các rừng của từng fold được checkpoint trong model/.cache/tune/ giữa các vòng.
+  Checkpoint khá nặng (~40 MB cho 1 cấu hình 150 cây x 5 fold, max_depth=None), tổng dung lượng
+  tỉ lệ với số cấu hình còn sống: sau mỗi vòng chỉ giữ checkpoint của cấu hình được chọn, lúc
+  khởi động xóa checkpoint không thuộc lần chạy hiện tại (vd. còn sót lại khi bị ngắt).
+- Các cấu hình được đánh giá song song trên process pool.
+- Latency được đo tuần tự trong process chính sau mỗi vòng (không tranh CPU với worker),
+  qua serving backend của service (model_service/backends.py), median của nhiều lần predict 1 record.
+- Kết quả từng cấu hình (điểm R2 từng fold, latency predict) được lưu vào
+  model/.cache/tune_results.jsonl, key = hash dữ liệu + tham số => chạy lại sẽ bỏ qua phần đã xong.
+- Objective = mean R2 - latency_weight * latency (ms / 1 record).
+
+Chạy:
+    python tune_forest.py
+    python tune_forest.py --latency-weight 0.01 --max-configs 30 --save ../models/rf_model_new.pkl
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Dict, List, Optional
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import random
+import sys
+import time
+
+import numpy as np
+
+from dataset import CACHE_DIR, TRAINING_DATA_PATH, file_sha256, load_xy
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, "model_service"))
+
+from backends import select_backend
+
+RESULTS_PATH = os.path.join(CACHE_DIR, "tune_results.jsonl")
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "tune")
+
+# Không gian tìm kiếm (n_estimators là resource, không nằm ở đây)
+PARAM_GRID = {
+    "max_depth": [10, 15, 20, None],
+    "min_samples_split": [2, 5, 10],
+    "min_samples_leaf": [1, 2, 4],
+    "max_features": [1.0, "sqrt", 0.5],
+}
+
+
+def param_configs(grid: Dict[str, list]) -> List[dict]:
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in product(*(grid[k] for k in keys))]
+
+
+def config_key(data_hash: str, params: dict, cv: int, seed: int) -> str:
+    payload = json.dumps({"data": data_hash, "params": params, "cv": cv, "seed": seed}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+# ============================================
+# RESULT STORE
+# ============================================
+class ResultStore:
+    """Append-only JSON lines: 1 dòng / (cấu hình, số cây)."""
+
+    def __init__(self, path: str = RESULTS_PATH):
+        self.path = path
+        self.results: Dict[tuple, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # dòng ghi dở khi bị ngắt giữa chừng
+                    self.results[(record["key"], record["n_estimators"])] = record
+
+    def get(self, key: str, n_estimators: int) -> Optional[dict]:
+        return self.results.get((key, n_estimators))
+
+    def add(self, record: dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        self.results[(record["key"], record["n_estimators"])] = record
+
+
+# ============================================
+# WORKER
+# ============================================
+_X = None
+_y = None
+_folds = None
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray, folds: list):
+    global _X, _y, _folds
+    _X, _y, _folds = X, y, folds
+
+
+def _evaluate(task: dict) -> dict:
+    """Fit (hoặc nuôi tiếp) 1 rừng cho mỗi fold tới n_estimators cây, trả về điểm từng fold."""
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import r2_score
+
+    checkpoint_path = os.path.join(CHECKPOINT_DIR, f"{task['key']}.pkl")
+    forests = None
+    if os.path.exists(checkpoint_path):
+        try:
+            with open(checkpoint_path, "rb") as f:
+                forests = pickle.load(f)
+            if len(forests) != len(_folds) or any(len(rf.estimators_) > task["n_estimators"] for rf in forests):
+                forests = None
+        except Exception:
+            forests = None
+    reused_trees = len(forests[0].estimators_) if forests else 0
+
+    start = time.perf_counter()
+    fold_scores = []
+    new_forests = []
+    for k, (train_idx, val_idx) in enumerate(_folds):
+        if forests:
+            rf = forests[k]
+        else:
+            # n_jobs=1: song song hóa ở mức process pool, tránh oversubscription
+            rf = RandomForestRegressor(warm_start=True, random_state=task["seed"], n_jobs=1, **task["params"])
+        rf.set_params(n_estimators=task["n_estimators"])
+        rf.fit(_X[train_idx], _y[train_idx])  # warm_start => chỉ train thêm số cây còn thiếu
+        fold_scores.append(float(r2_score(_y[val_idx], rf.predict(_X[val_idx]))))
+        new_forests.append(rf)
+    fit_seconds = time.perf_counter() - start
+
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    tmp_path = f"{checkpoint_path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(new_forests, f)
+    os.replace(tmp_path, checkpoint_path)
+
+    return {
+        "key": task["key"],
+        "data_hash": task["data_hash"],
+        "params": task["params"],
+        "n_estimators": task["n_estimators"],
+        "cv": len(_folds),
+        "seed": task["seed"],
+        "fold_scores": fold_scores,
+        "mean_r2": float(np.mean(fold_scores)),
+        "reused_trees": reused_trees,
+        "fit_seconds": fit_seconds,
+    }
+
+
+def _checkpoint_path(key: str) -> str:
+    return os.path.join(CHECKPOINT_DIR, f"{key}.pkl")
+
+
+def _remove_checkpoint(key: str):
+    path = _checkpoint_path(key)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def prune_checkpoints(keep_keys: set) -> int:
+    """Xóa checkpoint (và file .tmp ghi dở) không thuộc các cấu hình đang chạy. Trả về số byte giải phóng."""
+    if not os.path.isdir(CHECKPOINT_DIR):
+        return 0
+    freed = 0
+    for name in os.listdir(CHECKPOINT_DIR):
+        if name.endswith(".pkl") and name[:-len(".pkl")] in keep_keys:
+            continue
+        path = os.path.join(CHECKPOINT_DIR, name)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            freed += size
+        except OSError:
+            pass
+    return freed
+
+
+# ============================================
+# LATENCY (process chính)
+# ============================================
+LATENCY_METHOD = "backend-serial"
+
+
+def measure_latency_ms(key: str, row: np.ndarray, repeat: int = 50) -> dict:
+    """
+    Latency predict 1 record của rừng fold 0 (đọc từ checkpoint) qua serving backend,
+    median của `repeat` lần. Chạy tuần tự sau khi cả vòng fit xong để không bị worker tranh CPU.
+    """
+    with open(_checkpoint_path(key), "rb") as f:
+        rf = pickle.load(f)[0]
+    backend = select_backend(rf)
+    backend.predict(row)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        backend.predict(row)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return {"latency_ms": float(np.median(timings)), "latency_backend": backend.name,
+            "latency_method": LATENCY_METHOD}
+
+
+# ============================================
+# SUCCESSIVE HALVING
+# ============================================
+def objective(record: dict, latency_weight: float) -> float:
+    return record["mean_r2"] - latency_weight * record["latency_ms"]
+
+
+def successive_halving(configs: List[dict], X: np.ndarray, y: np.ndarray, data_hash: str,
+                       min_trees: int = 50, max_trees: int = 450, eta: int = 3, cv: int = 5,
+                       seed: int = 42, latency_weight: float = 0.0, workers: Optional[int] = None,
+                       store: Optional[ResultStore] = None) -> List[dict]:
+    from sklearn.model_selection import KFold
+
+    store = store or ResultStore()
+    folds = list(KFold(n_splits=cv, shuffle=True, random_state=seed).split(X))
+
+    rungs = []
+    n_trees = min_trees
+    while n_trees < max_trees:
+        rungs.append(n_trees)
+        n_trees *= eta
+    rungs.append(max_trees)
+
+    survivors = [{"params": p, "key": config_key(data_hash, p, cv, seed)} for p in configs]
+    freed = prune_checkpoints({c["key"] for c in survivors})
+    if freed:
+        print(f"🧹 Removed {freed / 2**20:.1f} MB of stale checkpoints from {CHECKPOINT_DIR}")
+    latency_row = X[folds[0][1][:1]]
+
+    def is_cached(c, n_trees):
+        # Kết quả cũ đo latency theo cách khác thì không so sánh được => đánh giá lại
+        record = store.get(c["key"], n_trees)
+        return record is not None and record.get("latency_method") == LATENCY_METHOD
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y, folds)) as pool:
+        for rung, n_trees in enumerate(rungs):
+            pending = [c for c in survivors if not is_cached(c, n_trees)]
+            print(f"\n🌲 Rung {rung + 1}/{len(rungs)}: {len(survivors)} configs x {n_trees} trees "
+                  f"({len(survivors) - len(pending)} cached, {len(pending)} to evaluate)")
+            tasks = [
+                {"key": c["key"], "params": c["params"], "n_estimators": n_trees, "seed": seed,
+                 "data_hash": data_hash}
+                for c in pending
+            ]
+            records = list(pool.map(_evaluate, tasks))
+            for record in records:
+                record.update(measure_latency_ms(record["key"], latency_row))
+                store.add(record)
+                print(f"  R2={record['mean_r2']:.4f} latency={record['latency_ms']:.2f}ms "
+                      f"(+{n_trees - record['reused_trees']} trees, {record['fit_seconds']:.1f}s) {record['params']}")
+
+            ranked = sorted(survivors, key=lambda c: objective(store.get(c["key"], n_trees), latency_weight),
+                            reverse=True)
+            if rung == len(rungs) - 1:
+                survivors = ranked
+                break
+            keep = max(1, len(ranked) // eta)
+            for c in ranked[keep:]:
+                _remove_checkpoint(c["key"])
+            survivors = ranked[:keep]
+
+    final = [store.get(c["key"], rungs[-1]) for c in survivors]
+    for c in survivors:
+        _remove_checkpoint(c["key"])
+    return final
+
+
+def print_leaderboard(records: List[dict], latency_weight: float, top: int = 10):
+    print(f"\n{'='*80}")
+    print(f"🏆 BEST CONFIGS (objective = mean R2 - {latency_weight} x latency ms)")
+    for record in records[:top]:
+        scores = ", ".join(f"{s:.3f}" for s in record["fold_scores"])
+        print(f"  {objective(record, latency_weight):.4f} | R2 {record['mean_r2']:.4f} [{scores}] | "
+              f"{record['latency_ms']:.2f}ms | {record['n_estimators']} trees | {record['params']}")
+    print(f"{'='*80}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Successive-halving search for the production random forest")
+    parser.add_argument("--min-trees", type=int, default=50)
+    parser.add_argument("--max-trees", type=int, default=450)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--latency-weight", type=float, default=0.0,
+                        help="R2 points traded per ms of single-record predict latency")
+    parser.add_argument("--max-configs", type=int, default=0, help="Random subset of the grid (0 = full grid)")
+    parser.add_argument("--save", help="Refit the best config on all data and pickle it to this path")
+    args = parser.parse_args()
+    # eta < 2 hoặc min_trees < 1 => vòng nhân số cây không bao giờ đạt max_trees
+    if args.eta < 2:
+        parser.error("--eta must be >= 2")
+    if args.min_trees < 1:
+        parser.error("--min-trees must be >= 1")
+    if args.max_trees < args.min_trees:
+        parser.error("--max-trees must be >= --min-trees")
+    if args.cv < 2:
+        parser.error("--cv must be >= 2")
+
+    X_df, y_series = load_xy()
+    X = X_df.to_numpy(dtype=np.float64)
+    y = y_series.to_numpy(dtype=np.float64)
+    data_hash = file_sha256(TRAINING_DATA_PATH)
+
+    configs = param_configs(PARAM_GRID)
+    if 0 < args.max_configs < len(configs):
+        configs = random.Random(args.seed).sample(configs, args.max_configs)
+    print(f"📥 Data: {X.shape} (hash {data_hash[:12]}), {len(configs)} configs")
+
+    best = successive_halving(configs, X, y, data_hash, min_trees=args.min_trees, max_trees=args.max_trees,
+                              eta=args.eta, cv=args.cv, seed=args.seed, latency_weight=args.latency_weight,
+                              workers=args.workers)
+    print_leaderboard(best, args.latency_weight)
+
+    if args.save:
+        from sklearn.ensemble import RandomForestRegressor
+
+        params = best[0]["params"]
+        rf = RandomForestRegressor(n_estimators=best[0]["n_estimators"], random_state=args.seed, n_jobs=-1,
+                                   **params)
+        rf.fit(X_df, y_series)  # fit với DataFrame để model giữ feature_names_in_ như notebook
+        with open(args.save, "wb") as f:
+            pickle.dump(rf, f)
+        print(f"✅ Đã lưu model: {args.save}")
@@ -0,0 +1,289 @@
+"""
+Serving backends: mỗi loại model có 1 backend với cùng interface batched
+    backend.predict(X: np.ndarray (n, n_features)) -> np.ndarray (n,)
+
+- TreeBackend:     DecisionTree / RandomForest / ExtraTrees. Toàn bộ node của mọi cây
+                   được gộp thành các mảng phẳng; duyệt cây vector hóa cho cả batch.
+- KNNBackend:      KNeighborsRegressor. KD-tree dựng sẵn 1 lần lúc load trên training set
+                   (dùng lại index của model nếu có, để thứ tự láng giềng trùng khoảng cách giống sklearn).
+- PipelineBackend: Pipeline (SimpleImputer/StandardScaler + estimator). Các bước
+                   impute + scale gộp thành 1 phép affine, estimator cuối dùng backend riêng.
+- SklearnBackend:  fallback, gọi thẳng model.predict.
+
+Backend được chọn theo manifest (models/manifest.json):
+    {"model": "rf_model_new.pkl", "backend": "auto"}
+"backend" có thể là auto | tree | knn | pipeline | sklearn.
+"""
+
+from typing import Optional
+import json
+import os
+import warnings
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+
+
+class ModelBackend:
+    name = "base"
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def describe(self) -> dict:
+        return {"backend": self.name, "model": type(self.model).__name__}
+
+
+class SklearnBackend(ModelBackend):
+    """Fallback: model.predict trên ndarray."""
+    name = "sklearn"
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        if hasattr(self.model, "feature_names_in_"):
+            # Model fit với DataFrame (vd. Pipeline chọn cột theo tên) => giữ tên cột
+            import pandas as pd
+            X = pd.DataFrame(X, columns=self.model.feature_names_in_)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", category=UserWarning)
+            return np.asarray(self.model.predict(X), dtype=np.float64).reshape(-1)
+
+
+class TreeBackend(ModelBackend):
+    """Cây quyết định / rừng cây dưới dạng mảng phẳng, duyệt cùng lúc mọi cây cho cả batch."""
+    name = "tree"
+
+    # Batch lớn (rows x trees vượt ngưỡng) thì predict đa luồng của sklearn nhanh hơn
+    # (đo bằng bench_backends.py: RF 500 cây hòa nhau ở ~200 rows)
+    MAX_VECTORIZED_CELLS = 100_000
+
+    def __init__(self, model):
+        super().__init__(model)
+        self._fallback = SklearnBackend(model)
+        estimators = getattr(model, "estimators_", None) or [model]
+        trees = [est.tree_ for est in estimators]
+        if any(t.n_outputs != 1 for t in trees):
+            raise ValueError("TreeBackend only supports single-output regressors")
+
+        offsets = np.cumsum([0] + [t.node_count for t in trees[:-1]])
+        # sklearn >= 1.3: NaN đi theo missing_go_to_left của từng node (không có NaN lúc fit
+        # thì là nhánh có nhiều sample hơn). Chỉ dùng khi chính model nhận NaN (RF sklearn 1.3 có
+        # thuộc tính này nhưng vẫn báo lỗi) => còn lại batch có NaN đi qua sklearn, lỗi giống model.predict.
+        self.supports_missing = (all(hasattr(t, "missing_go_to_left") for t in trees)
+                                 and _accepts_missing(self._fallback, model.n_features_in_))
+        left, right, feature, threshold, value, missing_left = [], [], [], [], [], []
+        for t, off in zip(trees, offsets):
+            node_ids = np.arange(t.node_count)
+            is_leaf = t.children_left == -1
+            # Lá trỏ về chính nó => duyệt đủ max_depth bước mà không cần nhánh riêng cho lá
+            left.append(np.where(is_leaf, node_ids, t.children_left) + off)
+            right.append(np.where(is_leaf, node_ids, t.children_right) + off)
+            feature.append(np.where(is_leaf, 0, t.feature))
+            threshold.append(np.where(is_leaf, np.inf, t.threshold))
+            value.append(t.value[:, 0, 0])
+            if self.supports_missing:
+                missing_left.append(np.asarray(t.missing_go_to_left, dtype=bool))
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        self.value = np.concatenate(value).astype(np.float64)
+        self.roots = offsets.astype(np.intp)
+        self.missing_left = np.concatenate(missing_left) if self.supports_missing else None
+        self.max_depth = max(t.max_depth for t in trees)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        n = X.shape[0]
+        if n * len(self.roots) > self.MAX_VECTORIZED_CELLS:
+            return self._fallback.predict(X)
+        # sklearn so sánh trên float32 (giá trị vượt float32 thành inf, sklearn cũng từ chối)
+        with np.errstate(over="ignore"):
+            X32 = np.asarray(X, dtype=np.float32)
+        has_missing = False
+        if not np.isfinite(X32).all():
+            # inf luôn bị sklearn từ chối => để sklearn báo lỗi, giống mọi kích thước batch
+            has_missing = bool(np.isnan(X32).any())
+            if np.isinf(X32).any() or not self.supports_missing:
+                return self._fallback.predict(X)
+        X = X32
+        rows = np.arange(n)[:, None]
+        node = np.broadcast_to(self.roots, (n, len(self.roots)))
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = x <= self.threshold[node]
+            if has_missing:
+                go_left |= np.isnan(x) & self.missing_left[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].mean(axis=1)
+
+    def describe(self) -> dict:
+        return {**super().describe(), "trees": len(self.roots), "nodes": len(self.value),
+                "max_depth": int(self.max_depth)}
+
+
+def _accepts_missing(backend: ModelBackend, n_features: int) -> bool:
+    """Model có predict được record chứa NaN không (tùy phiên bản sklearn / criterion)."""
+    try:
+        backend.predict(np.full((1, n_features), np.nan))
+    except ValueError:
+        return False
+    return True
+
+
+class KNNBackend(ModelBackend):
+    """KNeighborsRegressor với KD-tree dựng sẵn trên training set."""
+    name = "knn"
+
+    def __init__(self, model):
+        super().__init__(model)
+        from sklearn.neighbors import KDTree
+
+        metric = getattr(model, "effective_metric_", model.metric)
+        p = (getattr(model, "effective_metric_params_", None) or {}).get("p", model.p)
+        if metric == "euclidean":
+            p = 2
+        elif metric == "manhattan":
+            p = 1
+        elif metric != "minkowski":
+            raise ValueError(f"KNNBackend does not support metric '{metric}'")
+        if callable(model.weights) or model.weights not in ("uniform", "distance"):
+            raise ValueError(f"KNNBackend does not support weights '{model.weights}'")
+
+        self.k = model.n_neighbors
+        self.weights = model.weights
+        self.y = np.asarray(model._y, dtype=np.float64).reshape(len(model._fit_X), -1)[:, 0]
+        # model fit với algorithm kd_tree/ball_tree đã có sẵn index; brute thì dựng KD-tree mới
+        self.index = getattr(model, "_tree", None)
+        if self.index is None:
+            self.index = KDTree(np.asarray(model._fit_X, dtype=np.float64), leaf_size=model.leaf_size,
+                                metric="minkowski", p=float(p))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        dist, idx = self.index.query(np.asarray(X, dtype=np.float64), k=self.k)
+        neighbors_y = self.y[idx]
+        if self.weights == "uniform":
+            return neighbors_y.mean(axis=1)
+        # weights="distance": điểm trùng (dist=0) được ưu tiên tuyệt đối, như sklearn
+        with np.errstate(divide="ignore"):
+            w = 1.0 / dist
+        exact = np.isinf(w)
+        has_exact = exact.any(axis=1)
+        w[has_exact] = exact[has_exact].astype(np.float64)
+        return (neighbors_y * w).sum(axis=1) / w.sum(axis=1)
+
+    def describe(self) -> dict:
+        return {**super().describe(), "n_neighbors": self.k, "weights": self.weights,
+                "index": type(self.index).__name__, "training_rows": len(self.y)}
+
+
+class PipelineBackend(ModelBackend):
+    """Pipeline: impute + scale gộp thành 1 phép affine, rồi backend của estimator cuối."""
+    name = "pipeline"
+
+    def __init__(self, model):
+        super().__init__(model)
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import StandardScaler
+
+        steps = _flatten_pipeline(model)
+        fill = None
+        shift = None
+        scale = None
+        for _, step in steps[:-1]:
+            if step is None or step == "passthrough":
+                continue
+            if isinstance(step, SimpleImputer):
+                if shift is not None or scale is not None or not np.isnan(step.missing_values):
+                    raise ValueError("PipelineBackend only supports a NaN imputer before scaling")
+                if getattr(step, "indicator_", None) is not None:
+                    raise ValueError("PipelineBackend does not support add_indicator")
+                fill = np.asarray(step.statistics_, dtype=np.float64)
+            elif isinstance(step, StandardScaler):
+                mean = step.mean_ if step.with_mean else 0.0
+                std = step.scale_ if step.with_std else 1.0
+                # Gộp các scaler liên tiếp: (x - a)/b rồi (. - c)/d = (x - (a + b*c)) / (b*d)
+                if shift is None:
+                    shift, scale = np.asarray(mean, dtype=np.float64), np.asarray(std, dtype=np.float64)
+                else:
+                    shift = shift + scale * mean
+                    scale = scale * std
+            else:
+                raise ValueError(f"PipelineBackend does not support step {type(step).__name__}")
+        self.fill = fill
+        self.shift = shift
+        self.scale = scale
+        self.final = select_backend(steps[-1][1])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = np.array(X, dtype=np.float64)
+        if self.fill is not None:
+            missing = np.isnan(X)
+            if missing.any():
+                X[missing] = np.broadcast_to(self.fill, X.shape)[missing]
+        if self.shift is not None:
+            X -= self.shift
+            X /= self.scale
+        return self.final.predict(X)
+
+    def describe(self) -> dict:
+        return {**super().describe(), "imputer": self.fill is not None, "scaler": self.shift is not None,
+                "final": self.final.describe()}
+
+
+def _flatten_pipeline(model) -> list:
+    steps = []
+    for name, step in model.steps:
+        if hasattr(step, "steps"):
+            steps.extend(_flatten_pipeline(step))
+        else:
+            steps.append((name, step))
+    return steps
+
+
+BACKENDS = {
+    "tree": TreeBackend,
+    "knn": KNNBackend,
+    "pipeline": PipelineBackend,
+    "sklearn": SklearnBackend,
+}
+
+
+def select_backend(model, kind: str = "auto") -> ModelBackend:
+    """Chọn backend cho model. kind="auto" tự nhận diện; lỗi khi dựng backend chuyên biệt => SklearnBackend."""
+    if kind != "auto":
+        if kind not in BACKENDS:
+            raise ValueError(f"Unknown backend '{kind}', expected one of {['auto', *BACKENDS]}")
+        return BACKENDS[kind](model)
+
+    from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+    from sklearn.neighbors import KNeighborsRegressor
+    from sklearn.pipeline import Pipeline
+    from sklearn.tree import DecisionTreeRegressor, ExtraTreeRegressor
+
+    try:
+        if isinstance(model, Pipeline):
+            return PipelineBackend(model)
+        if isinstance(model, (RandomForestRegressor, ExtraTreesRegressor, DecisionTreeRegressor, ExtraTreeRegressor)):
+            return TreeBackend(model)
+        if isinstance(model, KNeighborsRegressor):
+            return KNNBackend(model)
+    except Exception as e:
+        print(f"⚠️ Specialized backend unavailable for {type(model).__name__} ({e}), using sklearn backend")
+    return SklearnBackend(model)
+
+
+def load_manifest(model_dir: str) -> Optional[dict]:
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            manifest = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid {MANIFEST_NAME}: {e}")
+    if not isinstance(manifest, dict):
+        raise ValueError(f"Invalid {MANIFEST_NAME}: expected a JSON object")
+    return manifest
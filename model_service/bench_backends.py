@@ -0,0 +1,136 @@
+"""
+Parity + benchmark cho các serving backend (backends.py) trên dataAfterpreprocess.csv.
+
+Với mỗi model (train nhanh theo tham số trong notebook, hoặc các file .pkl trong models/):
+- parity: max |backend.predict - model.predict| trên toàn bộ dataset, và trên các record
+  có NaN (mỗi feature lần lượt bị bỏ trống) với model hỗ trợ missing value
+- latency: 1 record/lần và cả batch
+
+Chạy:
+    python bench_backends.py                 # model train sẵn theo notebook
+    python bench_backends.py --models-dir ../models
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+import warnings
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, "model"))
+
+from backends import SklearnBackend, select_backend
+from dataset import load_xy
+
+
+def reference_models():
+    """Các loại model mà service hỗ trợ, tham số giống notebook."""
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.impute import SimpleImputer
+    from sklearn.neighbors import KNeighborsRegressor
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.tree import DecisionTreeRegressor
+
+    return {
+        "random_forest": RandomForestRegressor(n_estimators=500, max_depth=20, random_state=42, n_jobs=-1),
+        "decision_tree": DecisionTreeRegressor(max_depth=20, min_samples_split=15, min_samples_leaf=8,
+                                               random_state=42),
+        "knn": KNeighborsRegressor(n_neighbors=5),
+        "knn_pipeline": Pipeline([
+            ("preprocessor", Pipeline([("imputer", SimpleImputer(strategy="median")),
+                                       ("scaler", StandardScaler())])),
+            ("model", KNeighborsRegressor(n_neighbors=5, weights="distance")),
+        ]),
+        "rf_pipeline": Pipeline([
+            ("scaler", StandardScaler()),
+            ("model", RandomForestRegressor(n_estimators=200, max_depth=20, random_state=42, n_jobs=-1)),
+        ]),
+    }
+
+
+def _time_ms(fn, repeat: int) -> float:
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000.0
+
+
+def missing_rows(X: np.ndarray, rows: int = 5) -> np.ndarray:
+    """rows record đầu, lặp lại cho mỗi feature với feature đó = NaN (đủ nhỏ để không rơi vào fallback)."""
+    base = X[:rows]
+    X_missing = np.repeat(base[None], X.shape[1], axis=0)
+    for j in range(X.shape[1]):
+        X_missing[j, :, j] = np.nan
+    return X_missing.reshape(-1, X.shape[1])
+
+
+def _max_diff(backend, reference, X: np.ndarray) -> float:
+    return float(np.max(np.abs(backend.predict(X) - reference.predict(X))))
+
+
+def run(models: dict, X: np.ndarray, single_repeat: int = 50, batch_repeat: int = 5):
+    X_missing = missing_rows(X)
+    print(f"\n{'='*116}")
+    print(f"⏱️ BACKEND PARITY + BENCHMARK ({X.shape[0]} rows x {X.shape[1]} features)")
+    print(f"  {'model':<24}{'backend':<10}{'max|diff|':>12}{'NaN |diff|':>12}"
+          f"{'sklearn 1 row':>16}{'backend 1 row':>16}{'sklearn batch':>14}{'backend batch':>14}")
+    row = X[:1]
+    for name, model in models.items():
+        backend = select_backend(model)
+        reference = SklearnBackend(model)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", category=UserWarning)
+            max_diff = _max_diff(backend, reference, X)
+            try:
+                missing_diff = _max_diff(backend, reference, X_missing)
+            except ValueError:
+                missing_diff = None  # model không nhận NaN (vd. KNN không có imputer)
+            ref_single = _time_ms(lambda: reference.predict(row), single_repeat)
+            new_single = _time_ms(lambda: backend.predict(row), single_repeat)
+            ref_batch = _time_ms(lambda: reference.predict(X), batch_repeat)
+            new_batch = _time_ms(lambda: backend.predict(X), batch_repeat)
+        ok = max_diff < 1e-6 and (missing_diff is None or missing_diff < 1e-6)
+        status = "✅" if ok else "⚠️"
+        missing_text = "n/a" if missing_diff is None else f"{missing_diff:.2e}"
+        print(f"{status} {name:<24}{backend.name:<10}{max_diff:>12.2e}{missing_text:>12}"
+              f"{ref_single:>14.3f}ms{new_single:>14.3f}ms{ref_batch:>12.2f}ms{new_batch:>12.2f}ms")
+    print(f"{'='*116}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backend parity and benchmark harness")
+    parser.add_argument("--models-dir", help="Benchmark the .pkl models in this directory instead of training")
+    args = parser.parse_args()
+
+    X_df, y = load_xy()
+    X = X_df.to_numpy(dtype=np.float64)
+
+    if args.models_dir:
+        models = {}
+        for file_name in sorted(os.listdir(args.models_dir)):
+            if file_name.endswith(".pkl"):
+                with open(os.path.join(args.models_dir, file_name), "rb") as f:
+                    obj = pickle.load(f)
+                # models/ còn chứa scaler, vectorizer, PCA... không phải model
+                if not hasattr(obj, "predict"):
+                    print(f"⏭️ Skipping {file_name}: {type(obj).__name__} is not a model")
+                    continue
+                n_features = getattr(obj, "n_features_in_", X.shape[1])
+                if n_features != X.shape[1]:
+                    print(f"⏭️ Skipping {file_name}: expects {n_features} features, "
+                          f"dataAfterpreprocess.csv has {X.shape[1]}")
+                    continue
+                models[file_name] = obj
+    else:
+        print("📥 Training reference models on dataAfterpreprocess.csv ...")
+        models = reference_models()
+        for model in models.values():
+            model.fit(X_df, y)
+
+    run(models, X)
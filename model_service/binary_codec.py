@@ -0,0 +1,228 @@
+"""
+Binary fast path cho /predict: nhiều record đóng gói trong 1 request, không qua JSON/pydantic.
+
+Request body = N record liền nhau, little-endian, 60 bytes/record:
+    offset  type     field
+    0       f4       ram_gb            (bắt buộc, phải hữu hạn)
+    4       f4       rom_gb            (bắt buộc, phải hữu hạn; 1TB = 1024)
+    8       f4       front_camera_mp   (NaN = bỏ trống -> 12)
+    12      f4       back_camera_mp    (NaN = bỏ trống -> 12)
+    16      f4       battery_mah       (NaN = bỏ trống -> 4000)
+    20      f4       screen_size_in    (NaN = bỏ trống -> 6.0)
+    24      u1       brand             (index trong BRANDS)
+    25      3x pad
+    28      32s      chip              (UTF-8, pad bằng NUL)
+
+Giá trị vô hạn (±inf) ở bất kỳ field số nào, hoặc NaN ở field bắt buộc => 400.
+
+Response body = N record 12 bytes: price_usd (f4), price_vnd (i8).
+
+Đo throughput so với JSON /predict:
+    python binary_codec.py bench
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+BRANDS = ['Apple', 'Honor', 'Oppo', 'Other', 'Samsung', 'Vivo']
+BRAND_CODES = {b: i for i, b in enumerate(BRANDS)}
+OTHER_BRAND_CODE = BRAND_CODES['Other']
+
+RECORD_DTYPE = np.dtype({
+    "names": ["ram_gb", "rom_gb", "front_camera_mp", "back_camera_mp", "battery_mah", "screen_size_in",
+              "brand", "chip"],
+    "formats": ["<f4", "<f4", "<f4", "<f4", "<f4", "<f4", "u1", "S32"],
+    "offsets": [0, 4, 8, 12, 16, 20, 24, 28],
+    "itemsize": 60,
+})
+RESPONSE_DTYPE = np.dtype([("price_usd", "<f4"), ("price_vnd", "<i8")])
+
+CONTENT_TYPE = "application/octet-stream"
+
+# Field bắt buộc như trong PredictRequest: NaN/inf => 400
+REQUIRED_FIELDS = ["ram_gb", "rom_gb"]
+
+# Giá trị mặc định giống PredictRequest
+DEFAULTS = {
+    "front_camera_mp": 12.0,
+    "back_camera_mp": 12.0,
+    "battery_mah": 4000.0,
+    "screen_size_in": 6.0,
+}
+
+
+def decode_records(body: bytes) -> np.ndarray:
+    if len(body) % RECORD_DTYPE.itemsize != 0:
+        raise ValueError(f"Body length {len(body)} is not a multiple of record size {RECORD_DTYPE.itemsize}")
+    records = np.frombuffer(body, dtype=RECORD_DTYPE)
+    for name in REQUIRED_FIELDS:
+        bad = np.flatnonzero(~np.isfinite(records[name]))
+        if len(bad):
+            raise ValueError(f"Field '{name}' must be finite (record {int(bad[0])})")
+    # Field tùy chọn: NaN = bỏ trống, inf thì không hợp lệ
+    for name in DEFAULTS:
+        bad = np.flatnonzero(np.isinf(records[name]))
+        if len(bad):
+            raise ValueError(f"Field '{name}' must be finite or NaN (record {int(bad[0])})")
+    return records
+
+
+def _column(records: np.ndarray, name: str) -> np.ndarray:
+    values = records[name].astype(np.float64)
+    if name in DEFAULTS:
+        values[np.isnan(values)] = DEFAULTS[name]
+    return values
+
+
+def extract_features(records: np.ndarray, resolve_chip: Callable[[str], Tuple[float, str]],
+                     chip_vectors: Optional[Callable[[str], Tuple[float, ...]]] = None
+                     ) -> Tuple[Dict[str, np.ndarray], Dict[str, int]]:
+    """
+    Records -> {tên feature lúc train: cột giá trị} + số record theo kết quả tra processor.
+    Xử lý theo cột; resolve_chip (trả về (score, outcome)) và chip_vectors (Processor_vec1..N của
+    model cũ, nếu có) chỉ được gọi 1 lần cho mỗi tên chip khác nhau.
+    """
+    brand = records["brand"].astype(np.intp)
+    brand[brand >= len(BRANDS)] = OTHER_BRAND_CODE
+
+    chips, inverse, chip_counts = np.unique(records["chip"], return_inverse=True, return_counts=True)
+    chip_names = [c.decode("utf-8", errors="ignore") for c in chips]
+    resolved = [resolve_chip(c) for c in chip_names]
+    chip_scores = np.array([score for score, _ in resolved], dtype=np.float64)
+    outcome_counts: Dict[str, int] = {}
+    for (_, outcome), count in zip(resolved, chip_counts):
+        outcome_counts[outcome] = outcome_counts.get(outcome, 0) + int(count)
+
+    features = {
+        'RAM': _column(records, "ram_gb"),
+        'ROM': _column(records, "rom_gb") / 1024.0,  # GB -> TB (như rom_option_to_reg_feature)
+        'Front Camera': _column(records, "front_camera_mp"),
+        'Back Camera': _column(records, "back_camera_mp"),
+        'Battery Capacity': _column(records, "battery_mah") / 1000.0,
+        'Screen Size': _column(records, "screen_size_in"),
+        'Processor_Avg_Price_Scaled': chip_scores[inverse],
+    }
+    for name, code in BRAND_CODES.items():
+        features[f"Company_{name}"] = (brand == code).astype(np.float64)
+    if chip_vectors is not None:
+        vectors = np.array([chip_vectors(c) for c in chip_names], dtype=np.float64)
+        for j in range(vectors.shape[1]):
+            features[f"Processor_vec{j + 1}"] = vectors[inverse, j]
+    return features, outcome_counts
+
+
+def build_feature_matrix(features: Dict[str, np.ndarray], required_cols: List[str]) -> np.ndarray:
+    """Ma trận feature (n, len(required_cols)) theo đúng thứ tự cột của model."""
+    n = len(features['RAM'])
+    X = np.zeros((n, len(required_cols)), dtype=np.float64)
+    for j, col in enumerate(required_cols):
+        if col in features:
+            X[:, j] = features[col]
+        elif col == 'Launched Year':
+            X[:, j] = 2024  # giống /predict
+        # Cột khác (*_encoded, Processor_vec* khi không có vectorizer/PCA...) giữ 0 như /predict
+    return X
+
+
+def encode_response(price_usd: np.ndarray, usd_to_vnd: float) -> bytes:
+    out = np.empty(len(price_usd), dtype=RESPONSE_DTYPE)
+    out["price_usd"] = price_usd
+    out["price_vnd"] = np.maximum(0, np.round(price_usd * usd_to_vnd)).astype(np.int64)
+    return out.tobytes()
+
+
+# ============================================
+# CLIENT HELPERS
+# ============================================
+def encode_records(rows: List[Dict]) -> bytes:
+    """Đóng gói list dict (cùng field với PredictRequest, rom_option -> rom_gb) thành body binary."""
+    records = np.zeros(len(rows), dtype=RECORD_DTYPE)
+    for i, row in enumerate(rows):
+        records[i]["ram_gb"] = row["ram_gb"]
+        records[i]["rom_gb"] = row["rom_gb"]
+        for name in DEFAULTS:
+            value = row.get(name)
+            records[i][name] = np.nan if value is None else value
+        brand = str(row.get("brand", "Other")).strip().title()
+        records[i]["brand"] = BRAND_CODES.get(brand, OTHER_BRAND_CODE)
+        records[i]["chip"] = str(row["chip"]).strip().encode("utf-8")[:32]
+    return records.tobytes()
+
+
+def decode_response(body: bytes) -> np.ndarray:
+    return np.frombuffer(body, dtype=RESPONSE_DTYPE)
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+def _bench(n: int = 200):
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    rng = np.random.default_rng(0)
+    chips = ['A17 Bionic', 'Snapdragon 8 Gen 2', 'Dimensity 9200', 'Exynos 2400', 'Helio G99']
+    rows = [
+        {
+            "ram_gb": int(rng.choice([4, 6, 8, 12, 16])),
+            "rom_gb": int(rng.choice([64, 128, 256, 512, 1024])),
+            "chip": str(rng.choice(chips)),
+            "brand": str(rng.choice(BRANDS)),
+            "front_camera_mp": float(rng.choice([8, 12, 32])),
+            "back_camera_mp": float(rng.choice([12, 48, 50, 200])),
+            "battery_mah": int(rng.integers(3000, 6000)),
+            "screen_size_in": float(rng.uniform(5.5, 7.0)),
+        }
+        for _ in range(n)
+    ]
+    json_rows = [
+        {**{k: v for k, v in r.items() if k != "rom_gb"},
+         "rom_option": f"{r['rom_gb'] // 1024}TB" if r["rom_gb"] >= 1024 else f"{r['rom_gb']}GB"}
+        for r in rows
+    ]
+    packed = [encode_records([r]) for r in rows]
+    batch = encode_records(rows)
+    headers = {"Content-Type": CONTENT_TYPE}
+
+    def run(fn) -> float:
+        # /predict in log rất nhiều => bỏ stdout khi đo
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()  # warm-up
+            start = time.perf_counter()
+            fn()
+        return time.perf_counter() - start
+
+    json_s = run(lambda: [client.post("/predict", json=r) for r in json_rows])
+    single_s = run(lambda: [client.post("/predict/binary", content=b, headers=headers) for b in packed])
+    batch_s = run(lambda: client.post("/predict/binary", content=batch, headers=headers))
+
+    # Parity: cùng model, cùng feature => cùng giá
+    with contextlib.redirect_stdout(io.StringIO()):
+        json_prices = np.array([client.post("/predict", json=r).json()["price_usd"] for r in json_rows])
+    binary_prices = decode_response(client.post("/predict/binary", content=batch, headers=headers).content)
+    max_diff = float(np.max(np.abs(json_prices - binary_prices["price_usd"])))
+
+    print(f"\n{'='*60}")
+    print(f"⏱️ TRANSPORT BENCHMARK ({n} records, in-process TestClient)")
+    print(f"  {'JSON /predict (1 record/request)':<40}{n / json_s:>10.0f} records/s")
+    print(f"  {'Binary /predict/binary (1/request)':<40}{n / single_s:>10.0f} records/s")
+    print(f"  {'Binary /predict/binary (batch)':<40}{n / batch_s:>10.0f} records/s")
+    print(f"  Max |JSON - binary| price: ${max_diff:.4f}")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Binary /predict transport tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("bench", help="Compare binary and JSON throughput")
+    bench.add_argument("-n", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        _bench(args.n)
@@ -0,0 +1,227 @@
+"""
+Feature-drift monitor cho input của /predict.
+
+Mỗi feature số được tóm tắt bằng histogram cố định (bin edges = quantile của
+dữ liệu train trong dataAfterpreprocess.csv, cộng 2 bin "ngoài khoảng train"
+ở hai đầu) => bộ nhớ hằng số, mỗi update chỉ là 1 bisect + 1 phép cộng.
+Company và kết quả tra cứu processor (exact, fuzzy, fallback, default) được
+đếm theo category.
+
+Drift score = PSI (Population Stability Index) giữa phân phối live và phân
+phối tham chiếu. Quy ước thường dùng: < 0.1 ổn định, 0.1-0.25 lệch vừa, > 0.25 lệch mạnh.
+
+Tạo lại file tham chiếu (sau khi train lại):
+    python drift.py build-reference
+Đo chi phí update:
+    python drift.py bench
+"""
+
+from bisect import bisect_right
+from typing import Dict, List, Optional
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRAINING_CSV_PATH = os.path.join(BASE_DIR, "model", "dataAfterpreprocess.csv")
+DEFAULT_REFERENCE_PATH = os.path.join(BASE_DIR, "model", "drift_reference.json")
+sys.path.append(os.path.join(BASE_DIR, "model"))
+
+NUMERIC_FEATURES = [
+    'RAM', 'Front Camera', 'Back Camera', 'Battery Capacity', 'Screen Size', 'ROM',
+    'Processor_Avg_Price_Scaled'
+]
+COMPANIES = ['Apple', 'Honor', 'Oppo', 'Other', 'Samsung', 'Vivo']
+PROCESSOR_OUTCOMES = ['exact', 'fuzzy', 'fallback', 'default']
+
+QUANTILES = [i / 10 for i in range(1, 10)]
+PSI_EPS = 1e-4
+
+
+def psi(expected: List[float], actual_counts: List[int]) -> Optional[float]:
+    """Population Stability Index giữa tỉ lệ tham chiếu và số đếm live."""
+    total = sum(actual_counts)
+    if total == 0:
+        return None
+    score = 0.0
+    for e, c in zip(expected, actual_counts):
+        a = c / total
+        e = max(e, PSI_EPS)
+        a = max(a, PSI_EPS)
+        score += (a - e) * math.log(a / e)
+    return score
+
+
+# ============================================
+# REFERENCE SUMMARIES (từ training CSV)
+# ============================================
+def _bin_index(edges: List[float], upper: float, value: float) -> int:
+    # bin 0: < min train, bin len(edges)+1: > max train
+    if value > upper:
+        return len(edges) + 1
+    return bisect_right(edges, value)
+
+
+def build_reference(csv_path: str = TRAINING_CSV_PATH) -> dict:
+    # Cùng data layer (cache Arrow) với training / tune_forest
+    from dataset import load_training_data
+
+    data = load_training_data(csv_path)
+    reference = {"source": os.path.basename(csv_path), "rows": int(len(data)), "features": {}}
+    for col in NUMERIC_FEATURES:
+        values = data[col].astype(float).to_numpy()
+        lo, hi = float(values.min()), float(values.max())
+        # Dữ liệu rời rạc (RAM, ROM...) cho nhiều quantile trùng nhau => bỏ trùng
+        inner = sorted({lo, *(float(q) for q in np.quantile(values, QUANTILES))})
+        counts = [0] * (len(inner) + 2)
+        for v in values:
+            counts[_bin_index(inner, hi, v)] += 1
+        reference["features"][col] = {
+            "edges": inner,
+            "max": hi,
+            "proportions": [c / len(values) for c in counts],
+        }
+    company_counts = [int(data[f"Company_{c}"].sum()) for c in COMPANIES]
+    reference["company"] = [c / len(data) for c in company_counts]
+    # Mọi processor trong tập train đều có trong processor_map => 100% exact
+    reference["processor_outcome"] = [1.0, 0.0, 0.0, 0.0]
+    return reference
+
+
+def load_reference(path: str = DEFAULT_REFERENCE_PATH) -> dict:
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    print(f"⚠️ Drift reference not found at {path}, building from {TRAINING_CSV_PATH}")
+    return build_reference()
+
+
+# ============================================
+# STREAMING MONITOR
+# ============================================
+class DriftMonitor:
+    """Histogram streaming (bộ nhớ hằng số) cho từng feature, so với reference."""
+
+    def __init__(self, reference: dict):
+        self.reference = reference
+        self.started_at = time.time()
+        # Tuple (name, edges, max) để update không phải tra dict nhiều lần
+        self._numeric = [
+            (col, reference["features"][col]["edges"], reference["features"][col]["max"])
+            for col in NUMERIC_FEATURES
+        ]
+        self.counts: Dict[str, List[int]] = {
+            col: [0] * (len(edges) + 2) for col, edges, _ in self._numeric
+        }
+        self.company_counts = [0] * len(COMPANIES)
+        self.outcome_counts = [0] * len(PROCESSOR_OUTCOMES)
+        self._company_index = {c: i for i, c in enumerate(COMPANIES)}
+        self._outcome_index = {o: i for i, o in enumerate(PROCESSOR_OUTCOMES)}
+        self.total = 0
+
+    def update(self, features: dict, company: str, processor_outcome: str):
+        """Ghi nhận 1 request. `features` là dict feature đã xử lý (như feature_dict trong /predict)."""
+        counts = self.counts
+        for col, edges, upper in self._numeric:
+            value = features[col]
+            if value > upper:
+                counts[col][-1] += 1
+            else:
+                counts[col][bisect_right(edges, value)] += 1
+        self.company_counts[self._company_index.get(company, 3)] += 1
+        self.outcome_counts[self._outcome_index[processor_outcome]] += 1
+        self.total += 1
+
+    def update_batch(self, features: Dict[str, np.ndarray], company_counts: Dict[str, int],
+                     outcome_counts: Dict[str, int]):
+        """Ghi nhận nhiều record cùng lúc (binary /predict): đếm theo cột bằng searchsorted + bincount."""
+        n = 0
+        for col, edges, upper in self._numeric:
+            values = np.asarray(features[col], dtype=np.float64)
+            n = len(values)
+            idx = np.searchsorted(edges, values, side="right")
+            idx[values > upper] = len(edges) + 1
+            binned = np.bincount(idx, minlength=len(edges) + 2)
+            counts = self.counts[col]
+            for i, c in enumerate(binned.tolist()):
+                counts[i] += c
+        for company, count in company_counts.items():
+            self.company_counts[self._company_index.get(company, 3)] += int(count)
+        for outcome, count in outcome_counts.items():
+            self.outcome_counts[self._outcome_index[outcome]] += int(count)
+        self.total += n
+
+    def report(self) -> dict:
+        features = {}
+        for col, edges, upper in self._numeric:
+            counts = self.counts[col]
+            ref = self.reference["features"][col]
+            features[col] = {
+                "psi": psi(ref["proportions"], counts),
+                "below_train_range": counts[0] / self.total if self.total else 0.0,
+                "above_train_range": counts[-1] / self.total if self.total else 0.0,
+                "train_range": [edges[0], upper],
+            }
+        outcome = {
+            name: (count / self.total if self.total else 0.0)
+            for name, count in zip(PROCESSOR_OUTCOMES, self.outcome_counts)
+        }
+        return {
+            "requests": self.total,
+            "since": self.started_at,
+            "features": features,
+            "company": {
+                "psi": psi(self.reference["company"], self.company_counts),
+                "counts": dict(zip(COMPANIES, self.company_counts)),
+            },
+            "processor_outcome": {
+                "rates": outcome,
+                # Tỉ lệ chip không khớp chính xác với processor_map (train = 0)
+                "non_exact_rate": 1.0 - outcome["exact"] if self.total else 0.0,
+                "counts": dict(zip(PROCESSOR_OUTCOMES, self.outcome_counts)),
+            },
+        }
+
+    def reset(self):
+        for col in self.counts:
+            self.counts[col] = [0] * len(self.counts[col])
+        self.company_counts = [0] * len(COMPANIES)
+        self.outcome_counts = [0] * len(PROCESSOR_OUTCOMES)
+        self.total = 0
+        self.started_at = time.time()
+
+
+def _bench(n: int = 200_000):
+    monitor = DriftMonitor(load_reference())
+    sample = {
+        'RAM': 8.0, 'Front Camera': 12.0, 'Back Camera': 50.0, 'Battery Capacity': 5.0,
+        'Screen Size': 6.7, 'ROM': 0.25, 'Processor_Avg_Price_Scaled': 4.37,
+    }
+    start = time.perf_counter()
+    for _ in range(n):
+        monitor.update(sample, 'Samsung', 'exact')
+    elapsed = time.perf_counter() - start
+    print(f"⏱️ DriftMonitor.update: {elapsed / n * 1e6:.2f} µs/request ({n} updates)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feature-drift monitor tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build-reference", help="Precompute reference summaries from the training CSV")
+    build.add_argument("--csv", default=TRAINING_CSV_PATH)
+    build.add_argument("--out", default=DEFAULT_REFERENCE_PATH)
+    sub.add_parser("bench", help="Measure per-request update cost")
+    args = parser.parse_args()
+
+    if args.command == "build-reference":
+        ref = build_reference(args.csv)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(ref, f, indent=2)
+        print(f"✅ Drift reference saved to {args.out} ({ref['rows']} rows)")
+    elif args.command == "bench":
+        _bench()
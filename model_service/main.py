@@ -3,7 +3,7 @@ FastAPI service để serve Mobile Price Range Prediction model
 Chạy: python main.py
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import Optional, List, Tuple
@@ -11,12 +11,19 @@ import pickle
 import json
 import os
 import sys
+import numpy as np
 import pandas as pd
+import time
 import warnings
 
 # Import model từ parent directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from shadow import DEFAULT_LOG_PATH as DEFAULT_SHADOW_LOG_PATH, load_shadow_evaluator
+import binary_codec
+from backends import load_manifest, select_backend
+from drift import DEFAULT_REFERENCE_PATH as DEFAULT_DRIFT_REFERENCE_PATH, DriftMonitor, load_reference
+
 app = FastAPI(title="Mobile Price Range Prediction API")
 
 # CORS - Allow Next.js frontend
@@ -32,16 +39,20 @@ app.add_middleware(
 # MODEL SETUP
 # ============================================
 MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
-# Try multiple possible model file names
-# From modeling_knn_dt_rf_nn (3).ipynb: model is saved as 'rf_model_new.pkl'
-MODEL_PATH = None
-for model_name in ["rf_model_new.pkl", "price_predictor.pkl", "random_forest_model.pkl", "decision_tree_model.pkl", "knn_model.pkl"]:
-    potential_path = os.path.join(MODEL_DIR, model_name)
-    if os.path.exists(potential_path):
-        MODEL_PATH = potential_path
-        break
-if MODEL_PATH is None:
-    MODEL_PATH = os.path.join(MODEL_DIR, "rf_model_new.pkl")  # Default fallback (from new notebook)
+
+def resolve_model_path(manifest: dict) -> str:
+    if manifest.get("model"):
+        return os.path.join(MODEL_DIR, manifest["model"])
+    # Try multiple possible model file names
+    # From modeling_knn_dt_rf_nn (3).ipynb: model is saved as 'rf_model_new.pkl'
+    for model_name in ["rf_model_new.pkl", "price_predictor.pkl", "random_forest_model.pkl", "decision_tree_model.pkl", "knn_model.pkl"]:
+        potential_path = os.path.join(MODEL_DIR, model_name)
+        if os.path.exists(potential_path):
+            return potential_path
+    return os.path.join(MODEL_DIR, "rf_model_new.pkl")  # Default fallback (from new notebook)
+
+MODEL_MANIFEST = {}
+MODEL_PATH = os.path.join(MODEL_DIR, "rf_model_new.pkl")
 SCALER_PATH = os.path.join(MODEL_DIR, "scaler.pkl")
 VECTORIZER_PATH = os.path.join(MODEL_DIR, "processor_vectorizer.pkl")
 PCA_PATH = os.path.join(MODEL_DIR, "processor_pca.pkl")
@@ -63,12 +74,19 @@ except Exception as e:
 
 # Load model và scaler khi start service
 try:
+    # Artifact manifest (optional): models/manifest.json = {"model": "<file>.pkl", "backend": "auto"}
+    MODEL_MANIFEST = load_manifest(MODEL_DIR) or {}
+    MODEL_PATH = resolve_model_path(MODEL_MANIFEST)
     if not os.path.exists(MODEL_PATH):
         raise FileNotFoundError(f"Model file not found. Tried: {MODEL_PATH}\nPlease ensure one of these files exists in {MODEL_DIR}:\n  - price_predictor.pkl\n  - random_forest_model.pkl\n  - decision_tree_model.pkl\n  - knn_model.pkl")
     print(f"📥 Loading model from: {MODEL_PATH}")
     with open(MODEL_PATH, 'rb') as f:
         model = pickle.load(f)
     print("✅ Model loaded successfully")
+
+    # Serving backend (tree / knn / pipeline / sklearn), chọn theo manifest hoặc tự nhận diện
+    backend = select_backend(model, MODEL_MANIFEST.get("backend", "auto"))
+    print(f"✅ Serving backend: {backend.describe()}")
     
     # Load scaler nếu có
     scaler = None
@@ -117,6 +135,14 @@ except Exception as e:
     print(f"❌ Error loading model: {e}")
     sys.exit(1)
 
+# Drift monitor: so sánh phân phối input live với dữ liệu train (dataAfterpreprocess.csv)
+drift_monitor = None
+try:
+    drift_monitor = DriftMonitor(load_reference(os.environ.get('DRIFT_REFERENCE_PATH', DEFAULT_DRIFT_REFERENCE_PATH)))
+    print("✅ Drift monitor ready")
+except Exception as e:
+    print(f"⚠️ Failed to initialize drift monitor: {e}, drift monitoring disabled")
+
 # ============================================
 # REQUEST/RESPONSE MODELS
 # ============================================
@@ -230,6 +256,159 @@ def map_price_to_class_and_proba(price_vnd: float) -> Tuple[int, List[float]]:
         proba = [1.0 if i == chosen_class else 0.0 for i in range(4)]
     return chosen_class, proba
 
+# Final fallback: approximate mapping based on processor tier
+# These are rough estimates based on typical processor prices / 100
+FALLBACK_PROCESSOR_MAPPING = {
+    # Apple A-series (premium: $800-1200 -> 8-12)
+    'a17 pro': 11.0, 'a17': 11.0,
+    'a16 bionic': 10.5, 'a16': 10.5,
+    'a15 bionic': 9.5, 'a15': 9.5,
+    'a14 bionic': 9.0, 'a14': 9.0,
+    'a13 bionic': 8.0, 'a13': 8.0,
+    'a12 bionic': 7.5, 'a12': 7.5, 'a12z bionic': 8.5, 'a12z': 8.5,
+    # Snapdragon 8 series (flagship: $700-1100 -> 7-11)
+    'snapdragon 8 gen 3': 10.5, 'sd 8 gen 3': 10.5, '8 gen 3': 10.5,
+    'snapdragon 8 gen 2': 9.5, 'sd 8 gen 2': 9.5, '8 gen 2': 9.5,
+    'snapdragon 8 gen 1': 8.5, 'sd 8 gen 1': 8.5, '8 gen 1': 8.5,
+    'qualcomm snapdragon 8 gen 3': 10.5,
+    'qualcomm snapdragon 8 gen 2': 9.5,
+    'qualcomm snapdragon 8 gen 1': 8.5,
+    # Snapdragon 7 series (mid-high: $400-700 -> 4-7)
+    'snapdragon 7 gen': 5.5, 'sd 7 gen': 5.5, '7 gen': 5.5,
+    # Other premium
+    'kirin 9010': 7.5, 'kirin 9000': 7.0,
+    'google tensor g4': 8.0, 'tensor g4': 8.0,
+    'google tensor g3': 7.0, 'tensor g3': 7.0,
+    # Mid-range ($200-400 -> 2-4)
+    'snapdragon 6': 3.0, 'sd 6': 3.0,
+    'mediatek dimensity': 3.5, 'dimensity': 3.5,
+    'helio': 2.5,
+}
+
+def resolve_processor(chip: str, verbose: bool = True) -> Tuple[float, str]:
+    """
+    Map chip name -> Processor_Avg_Price_Scaled.
+    Returns (value, outcome) with outcome in exact | fuzzy | fallback | default.
+    """
+    processor_avg_price_scaled = 4.37  # Default fallback (from predict_app.py)
+
+    # Try to get from processor_map.pkl first (exact match)
+    chip_original = chip.strip()
+    if processor_map and chip_original in processor_map:
+        processor_avg_price_scaled = float(processor_map[chip_original])
+        if verbose:
+            print(f"✅ Found processor '{chip_original}' in map: {processor_avg_price_scaled:.2f}")
+        return processor_avg_price_scaled, 'exact'
+
+    # Fallback: try fuzzy matching with processor_map keys
+    chip_lower = chip_original.lower()
+    for map_key in processor_map.keys():
+        map_key_lower = str(map_key).lower()
+        # Check if chip name contains map key or vice versa
+        if chip_lower in map_key_lower or map_key_lower in chip_lower:
+            processor_avg_price_scaled = float(processor_map[map_key])
+            if verbose:
+                print(f"✅ Matched processor '{chip_original}' to '{map_key}' in map: {processor_avg_price_scaled:.2f}")
+            return processor_avg_price_scaled, 'fuzzy'
+
+    for key, value in FALLBACK_PROCESSOR_MAPPING.items():
+        if key in chip_lower or chip_lower in key:
+            if verbose:
+                print(f"⚠️ Using fallback mapping for '{chip_original}': {value:.2f}")
+            return value, 'fallback'
+
+    if verbose:
+        print(f"⚠️ Processor '{chip_original}' not found in map or fallback, using default {processor_avg_price_scaled:.2f}")
+    return processor_avg_price_scaled, 'default'
+
+def get_required_columns(model, verbose: bool = False) -> List[str]:
+    """Feature names the model expects, in order (falls back to REG_FEATURE_ORDER + Launched Year)."""
+    from sklearn.pipeline import Pipeline
+    is_pipeline = isinstance(model, Pipeline)
+
+    if verbose:
+        print(f"🔍 Model type: {type(model).__name__}, Is Pipeline: {is_pipeline}")
+
+    # Try to get feature names from model
+    required_cols = None
+    if is_pipeline:
+        # For Pipeline, try to get from final estimator
+        final_estimator = model.steps[-1][1] if hasattr(model, 'steps') else None
+        if verbose:
+            print(f"🔍 Pipeline steps: {[s[0] for s in model.steps] if hasattr(model, 'steps') else 'N/A'}")
+            print(f"🔍 Final estimator type: {type(final_estimator).__name__ if final_estimator else 'N/A'}")
+
+        if final_estimator and hasattr(final_estimator, 'feature_names_in_'):
+            required_cols = list(final_estimator.feature_names_in_)
+            if verbose:
+                print(f"✅ Got feature names from final estimator: {required_cols}")
+        # Or try from preprocessor
+        elif 'preprocessor' in model.named_steps:
+            pre = model.named_steps['preprocessor']
+            if verbose:
+                print(f"🔍 Preprocessor type: {type(pre).__name__}")
+            if hasattr(pre, 'named_steps') and 'imputer' in pre.named_steps:
+                imputer = pre.named_steps['imputer']
+                if hasattr(imputer, 'feature_names_in_'):
+                    required_cols = list(imputer.feature_names_in_)
+                    if verbose:
+                        print(f"✅ Got feature names from imputer: {required_cols}")
+    else:
+        # Direct model (RandomForestRegressor, etc.)
+        if hasattr(model, 'feature_names_in_'):
+            required_cols = list(model.feature_names_in_)
+            if verbose:
+                print(f"✅ Got feature names from direct model: {required_cols}")
+
+    # Fallback to hardcoded feature order if model doesn't have feature names
+    if required_cols is None:
+        if verbose:
+            print("⚠️ Cannot determine feature names from model, using default order")
+        required_cols = REG_FEATURE_ORDER.copy()
+        # Add Launched Year if model expects it
+        if 'Launched Year' not in required_cols:
+            required_cols.append('Launched Year')
+    elif verbose:
+        print(f"✅ Using model feature names: {len(required_cols)} features")
+    return required_cols
+
+def processor_vectors(chip: str) -> Tuple[float, float, float]:
+    """Processor_vec1-3 (TF-IDF + PCA, model cũ). (0, 0, 0) nếu không có vectorizer/PCA."""
+    if vectorizer is None or pca is None:
+        return 0.0, 0.0, 0.0
+    try:
+        tfidf = vectorizer.transform([chip])
+        pca_vals = pca.transform(tfidf.toarray())[0]
+        # len 3 expected
+        return float(pca_vals[0]), float(pca_vals[1]), float(pca_vals[2])
+    except Exception:
+        return 0.0, 0.0, 0.0
+
+# Thứ tự cột feature của model (binary fast path, shadow) chỉ cần xác định 1 lần
+BINARY_FEATURE_COLS = get_required_columns(model)
+BINARY_MAX_RECORDS = int(os.environ.get('BINARY_MAX_RECORDS', '100000'))
+
+# Shadow/canary model: chấm lại một phần request bằng model thứ hai (ngoài request path)
+# SHADOW_MODEL_PATH có thể là đường dẫn đầy đủ hoặc tên file trong MODEL_DIR
+shadow = None
+SHADOW_MODEL_PATH = os.environ.get('SHADOW_MODEL_PATH')
+if SHADOW_MODEL_PATH:
+    if not os.path.isabs(SHADOW_MODEL_PATH) and not os.path.exists(SHADOW_MODEL_PATH):
+        SHADOW_MODEL_PATH = os.path.join(MODEL_DIR, SHADOW_MODEL_PATH)
+    shadow = load_shadow_evaluator(
+        SHADOW_MODEL_PATH,
+        BINARY_FEATURE_COLS,
+        sample_rate=float(os.environ.get('SHADOW_SAMPLE_RATE', '0.1')),
+        log_path=os.environ.get('SHADOW_LOG_PATH', DEFAULT_SHADOW_LOG_PATH),
+        max_pending=int(os.environ.get('SHADOW_MAX_PENDING', '64')),
+    )
+
+# Processor_vec* (TF-IDF + PCA) chỉ tính khi model chính hoặc model shadow cần
+NEEDS_PROCESSOR_VEC = any(
+    col.startswith('Processor_vec')
+    for col in BINARY_FEATURE_COLS + (shadow.feature_names if shadow is not None else [])
+)
+
 # ============================================
 # API ENDPOINTS
 # ============================================
@@ -239,7 +418,10 @@ def root():
         "message": "Mobile Price Range Prediction API",
         "status": "running",
         "endpoints": {
-            "predict": "/predict (POST)"
+            "predict": "/predict (POST)",
+            "predict_binary": "/predict/binary (POST, application/octet-stream)",
+            "shadow": "/shadow (GET)",
+            "drift": "/drift (GET), /drift/reset (POST)"
         }
     }
 
@@ -321,63 +503,7 @@ async def predict(request: PredictRequest):
         # Processor_Avg_Price_Scaled: From create_map.py
         # Formula: Processor_Avg_Price_Scaled = average_price_of_phones_with_this_processor / 100
         # Range in CSV: ~1.29 to ~17.99 (not 0-1!)
-        processor_avg_price_scaled = 4.37  # Default fallback (from predict_app.py)
-        
-        # Try to get from processor_map.pkl first (exact match)
-        chip_original = request.chip.strip()
-        if processor_map and chip_original in processor_map:
-            processor_avg_price_scaled = float(processor_map[chip_original])
-            print(f"✅ Found processor '{chip_original}' in map: {processor_avg_price_scaled:.2f}")
-        else:
-            # Fallback: try fuzzy matching with processor_map keys
-            chip_lower = chip_original.lower()
-            matched_key = None
-            for map_key in processor_map.keys():
-                map_key_lower = str(map_key).lower()
-                # Check if chip name contains map key or vice versa
-                if chip_lower in map_key_lower or map_key_lower in chip_lower:
-                    processor_avg_price_scaled = float(processor_map[map_key])
-                    matched_key = map_key
-                    print(f"✅ Matched processor '{chip_original}' to '{map_key}' in map: {processor_avg_price_scaled:.2f}")
-                    break
-            
-            if matched_key is None:
-                # Final fallback: use approximate mapping based on processor tier
-                # These are rough estimates based on typical processor prices / 100
-                fallback_mapping = {
-                    # Apple A-series (premium: $800-1200 -> 8-12)
-                    'a17 pro': 11.0, 'a17': 11.0,
-                    'a16 bionic': 10.5, 'a16': 10.5,
-                    'a15 bionic': 9.5, 'a15': 9.5,
-                    'a14 bionic': 9.0, 'a14': 9.0,
-                    'a13 bionic': 8.0, 'a13': 8.0,
-                    'a12 bionic': 7.5, 'a12': 7.5, 'a12z bionic': 8.5, 'a12z': 8.5,
-                    # Snapdragon 8 series (flagship: $700-1100 -> 7-11)
-                    'snapdragon 8 gen 3': 10.5, 'sd 8 gen 3': 10.5, '8 gen 3': 10.5,
-                    'snapdragon 8 gen 2': 9.5, 'sd 8 gen 2': 9.5, '8 gen 2': 9.5,
-                    'snapdragon 8 gen 1': 8.5, 'sd 8 gen 1': 8.5, '8 gen 1': 8.5,
-                    'qualcomm snapdragon 8 gen 3': 10.5,
-                    'qualcomm snapdragon 8 gen 2': 9.5,
-                    'qualcomm snapdragon 8 gen 1': 8.5,
-                    # Snapdragon 7 series (mid-high: $400-700 -> 4-7)
-                    'snapdragon 7 gen': 5.5, 'sd 7 gen': 5.5, '7 gen': 5.5,
-                    # Other premium
-                    'kirin 9010': 7.5, 'kirin 9000': 7.0,
-                    'google tensor g4': 8.0, 'tensor g4': 8.0,
-                    'google tensor g3': 7.0, 'tensor g3': 7.0,
-                    # Mid-range ($200-400 -> 2-4)
-                    'snapdragon 6': 3.0, 'sd 6': 3.0,
-                    'mediatek dimensity': 3.5, 'dimensity': 3.5,
-                    'helio': 2.5,
-                }
-                
-                for key, value in fallback_mapping.items():
-                    if key in chip_lower or chip_lower in key:
-                        processor_avg_price_scaled = value
-                        print(f"⚠️ Using fallback mapping for '{chip_original}': {processor_avg_price_scaled:.2f}")
-                        break
-                else:
-                    print(f"⚠️ Processor '{chip_original}' not found in map or fallback, using default {processor_avg_price_scaled:.2f}")
+        processor_avg_price_scaled, processor_outcome = resolve_processor(request.chip)
         
         # Debug: Print all feature values
         print(f"\n{'='*60}")
@@ -393,62 +519,10 @@ async def predict(request: PredictRequest):
         print(f"{'='*60}\n")
         
         # Also keep old processor vectors for backward compatibility (if model needs it)
-        proc_vec1 = 0.0
-        proc_vec2 = 0.0
-        proc_vec3 = 0.0
-        if 'vectorizer' in globals() and vectorizer is not None and 'pca' in globals() and pca is not None:
-            try:
-                tfidf = vectorizer.transform([request.chip])
-                pca_vals = pca.transform(tfidf.toarray())[0]
-                # len 3 expected
-                proc_vec1, proc_vec2, proc_vec3 = float(pca_vals[0]), float(pca_vals[1]), float(pca_vals[2])
-            except Exception:
-                pass
+        proc_vec1, proc_vec2, proc_vec3 = processor_vectors(request.chip)
 
         # Get required feature names from model
-        required_cols = None
-        
-        # Check if model is a Pipeline
-        from sklearn.pipeline import Pipeline
-        is_pipeline = isinstance(model, Pipeline)
-        
-        print(f"🔍 Model type: {type(model).__name__}, Is Pipeline: {is_pipeline}")
-        
-        # Try to get feature names from model
-        required_cols = None
-        if is_pipeline:
-            # For Pipeline, try to get from final estimator
-            final_estimator = model.steps[-1][1] if hasattr(model, 'steps') else None
-            print(f"🔍 Pipeline steps: {[s[0] for s in model.steps] if hasattr(model, 'steps') else 'N/A'}")
-            print(f"🔍 Final estimator type: {type(final_estimator).__name__ if final_estimator else 'N/A'}")
-            
-            if final_estimator and hasattr(final_estimator, 'feature_names_in_'):
-                required_cols = list(final_estimator.feature_names_in_)
-                print(f"✅ Got feature names from final estimator: {required_cols}")
-            # Or try from preprocessor
-            elif 'preprocessor' in model.named_steps:
-                pre = model.named_steps['preprocessor']
-                print(f"🔍 Preprocessor type: {type(pre).__name__}")
-                if hasattr(pre, 'named_steps') and 'imputer' in pre.named_steps:
-                    imputer = pre.named_steps['imputer']
-                    if hasattr(imputer, 'feature_names_in_'):
-                        required_cols = list(imputer.feature_names_in_)
-                        print(f"✅ Got feature names from imputer: {required_cols}")
-        else:
-            # Direct model (RandomForestRegressor, etc.)
-            if hasattr(model, 'feature_names_in_'):
-                required_cols = list(model.feature_names_in_)
-                print(f"✅ Got feature names from direct model: {required_cols}")
-        
-        # Fallback to hardcoded feature order if model doesn't have feature names
-        if required_cols is None:
-            print("⚠️ Cannot determine feature names from model, using default order")
-            required_cols = REG_FEATURE_ORDER.copy()
-            # Add Launched Year if model expects it
-            if 'Launched Year' not in required_cols:
-                required_cols.append('Launched Year')
-        else:
-            print(f"✅ Using model feature names: {len(required_cols)} features")
+        required_cols = get_required_columns(model, verbose=True)
         
         # Build feature dictionary first
         feature_dict = {}
@@ -528,23 +602,15 @@ async def predict(request: PredictRequest):
                 warnings.filterwarnings("ignore", message="X does not have valid feature names")
                 warnings.filterwarnings("ignore", category=UserWarning)
                 
-                # Check if model is a Pipeline (from notebook, model is saved as Pipeline)
-                # Pipeline contains: preprocessor (SimpleImputer + StandardScaler) + model
-                # If it's a Pipeline, it will automatically apply preprocessing
+                # Pipeline (SimpleImputer + StandardScaler + model) / tree / KNN được xử lý
+                # trong backends.py - cùng 1 interface batched predict(ndarray)
                 print(f"🔍 About to predict with DataFrame shape: {X_in.shape}")
                 print(f"🔍 DataFrame columns: {list(X_in.columns)}")
-                print(f"🔍 DataFrame dtypes:\n{X_in.dtypes}")
-                
-                if is_pipeline:
-                    # Pipeline expects raw features (not pre-scaled)
-                    # It will apply imputer and scaler internally
-                    # Note: Pipeline may not preserve feature names, so we pass DataFrame directly
-                    print("🔍 Using Pipeline.predict()")
-                else:
-                    # Direct model - use as is (RandomForestRegressor from new notebook)
-                    print("🔍 Using direct model.predict()")
+                print(f"🔍 Using {backend.name} backend")
                 
-                prediction_result = model.predict(X_in)
+                predict_start = time.perf_counter()
+                prediction_result = backend.predict(X_in.to_numpy(dtype=np.float64))
+                predict_ms = (time.perf_counter() - predict_start) * 1000.0
                 print(f"🔍 Prediction result type: {type(prediction_result)}, shape: {prediction_result.shape if hasattr(prediction_result, 'shape') else 'N/A'}")
                 
                 # Model output is already in USD (not normalized)
@@ -560,6 +626,42 @@ async def predict(request: PredictRequest):
             print(f"❌ Prediction error details:\n{error_detail}")
             raise HTTPException(status_code=500, detail=f"Model predict failed: {str(e)}")
 
+        # Drift: chỉ tính request predict thành công
+        if drift_monitor is not None:
+            drift_monitor.update(
+                {
+                    'RAM': ram_feature,
+                    'Front Camera': front_cam_feature,
+                    'Back Camera': back_cam_feature,
+                    'Battery Capacity': battery_capacity_feature,
+                    'Screen Size': screen_size_feature,
+                    'ROM': rom_feature,
+                    'Processor_Avg_Price_Scaled': processor_avg_price_scaled,
+                },
+                brand_upper if company['Company_Other'] == 0 else 'Other',
+                processor_outcome,
+            )
+
+        # Shadow model: chỉ enqueue, không chờ kết quả
+        if shadow is not None:
+            shadow.maybe_submit(
+                {
+                    'RAM': ram_feature,
+                    'Front Camera': front_cam_feature,
+                    'Back Camera': back_cam_feature,
+                    'Battery Capacity': battery_capacity_feature,
+                    'Screen Size': screen_size_feature,
+                    'ROM': rom_feature,
+                    'Processor_Avg_Price_Scaled': processor_avg_price_scaled,
+                    'Processor_vec1': proc_vec1,
+                    'Processor_vec2': proc_vec2,
+                    'Processor_vec3': proc_vec3,
+                    **company,
+                },
+                price_usd,
+                predict_ms,
+            )
+
         # Convert to VND
         usd_to_vnd = float(os.environ.get('USD_TO_VND', '25000'))
         price_vnd = int(max(0, round(price_usd * usd_to_vnd)))
@@ -582,9 +684,81 @@ async def predict(request: PredictRequest):
         print(f"❌ Full error traceback:\n{error_detail}")
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+@app.post("/predict/binary")
+async def predict_binary(request: Request):
+    """
+    Low-overhead batch endpoint: packed fixed-layout records in, packed prices out
+    (layout in binary_codec.py). Uses the same model as /predict.
+    """
+    body = await request.body()
+    # Kiểm tra giới hạn trước khi decode / quét giá trị
+    if len(body) > BINARY_MAX_RECORDS * binary_codec.RECORD_DTYPE.itemsize:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many records ({len(body) // binary_codec.RECORD_DTYPE.itemsize} > {BINARY_MAX_RECORDS})",
+        )
+    try:
+        records = binary_codec.decode_records(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(records) == 0:
+        return Response(content=b"", media_type=binary_codec.CONTENT_TYPE)
+
+    try:
+        features, outcome_counts = binary_codec.extract_features(
+            records, lambda chip: resolve_processor(chip, verbose=False),
+            processor_vectors if NEEDS_PROCESSOR_VEC else None,
+        )
+        X = binary_codec.build_feature_matrix(features, BINARY_FEATURE_COLS)
+        predict_start = time.perf_counter()
+        price_usd = backend.predict(X)
+        predict_ms = (time.perf_counter() - predict_start) * 1000.0
+    except Exception as e:
+        print(f"❌ Binary prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+    if drift_monitor is not None:
+        company_counts = {name: int(features[f"Company_{name}"].sum()) for name in binary_codec.BRANDS}
+        drift_monitor.update_batch(features, company_counts, outcome_counts)
+
+    # Shadow model: sample từng record, latency primary tính trung bình / record
+    if shadow is not None:
+        shadow.maybe_submit_batch(features, price_usd, predict_ms / len(records))
+
+    usd_to_vnd = float(os.environ.get('USD_TO_VND', '25000'))
+    return Response(
+        content=binary_codec.encode_response(price_usd, usd_to_vnd),
+        media_type=binary_codec.CONTENT_TYPE,
+        headers={"X-Record-Count": str(len(records))},
+    )
+
 @app.get("/health")
 def health():
-    return {"status": "healthy", "model_loaded": model is not None}
+    return {"status": "healthy", "model_loaded": model is not None, "backend": backend.describe()}
+
+@app.get("/shadow")
+def shadow_status():
+    if shadow is None:
+        return {"enabled": False}
+    return {"enabled": True, **shadow.stats()}
+
+@app.get("/drift")
+def drift():
+    if drift_monitor is None:
+        return {"enabled": False}
+    return {"enabled": True, **drift_monitor.report()}
+
+@app.post("/drift/reset")
+def drift_reset():
+    if drift_monitor is None:
+        raise HTTPException(status_code=404, detail="Drift monitor is disabled")
+    drift_monitor.reset()
+    return {"status": "reset"}
+
+@app.on_event("shutdown")
+def shutdown_shadow():
+    if shadow is not None:
+        shadow.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,256 @@
+"""
+Shadow (canary) model evaluation chạy song song với model đang serve.
+
+Một phần request /predict (SHADOW_SAMPLE_RATE) được chấm lại bằng model thứ hai
+(qua serving backend trong backends.py; ma trận feature dựng theo cột của model shadow
+với cùng quy tắc điền giá trị như /predict)
+trên background executor, KHÔNG nằm trên request path. Hàng đợi có giới hạn
+(SHADOW_MAX_PENDING): khi đầy thì bỏ qua mẫu đó thay vì làm chậm request.
+
+Mỗi mẫu được ghi thành 1 record nhị phân cố định 24 bytes vào log:
+    timestamp (f8), primary_usd (f4), shadow_usd (f4), primary_ms (f4), shadow_ms (f4)
+
+Xem báo cáo:
+    python shadow.py report [--log logs/shadow_log.bin]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import argparse
+import os
+import pickle
+import random
+import struct
+import threading
+import time
+
+import numpy as np
+
+from backends import select_backend
+from binary_codec import build_feature_matrix
+
+RECORD_FORMAT = "<dffff"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+RECORD_DTYPE = np.dtype([
+    ("ts", "<f8"),
+    ("primary_usd", "<f4"),
+    ("shadow_usd", "<f4"),
+    ("primary_ms", "<f4"),
+    ("shadow_ms", "<f4"),
+])
+
+DEFAULT_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "shadow_log.bin")
+
+
+def model_feature_names(model) -> Optional[list]:
+    """Feature names the model was fitted with (direct model or Pipeline final step)."""
+    if hasattr(model, "feature_names_in_"):
+        return list(model.feature_names_in_)
+    if hasattr(model, "steps"):
+        final_estimator = model.steps[-1][1]
+        if hasattr(final_estimator, "feature_names_in_"):
+            return list(final_estimator.feature_names_in_)
+    return None
+
+
+class ShadowEvaluator:
+    """Chấm lại một mẫu request bằng model shadow, ngoài request path."""
+
+    def __init__(self, model, input_columns: List[str], sample_rate: float = 0.1,
+                 log_path: str = DEFAULT_LOG_PATH, max_pending: int = 64, workers: int = 1):
+        self.model = model
+        # Cùng loại backend như model chính => so sánh latency công bằng
+        self.backend = select_backend(model)
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        self.log_path = log_path
+        # Model shadow có thể được train với bộ cột khác model chính (vd. thêm Launched Year):
+        # ma trận được dựng theo cột của nó với cùng quy tắc điền giá trị như /predict
+        self.feature_names = model_feature_names(model) or list(input_columns)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shadow")
+        # Bounded queue: mỗi job đang chờ/đang chạy giữ 1 slot
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        self._log_file = open(log_path, "ab", buffering=0)
+        self.submitted = 0
+        self.dropped = 0
+        self.logged = 0
+        self.errors = 0
+
+    def maybe_submit(self, features: Dict[str, float], primary_usd: float, primary_ms: float) -> bool:
+        """
+        Gửi request vào hàng đợi shadow nếu được sample và còn chỗ. Không bao giờ block.
+        `features` là dict {tên feature: giá trị} đã xử lý (như binary_codec.extract_features, 1 record).
+        """
+        if self.sample_rate <= 0.0 or random.random() >= self.sample_rate:
+            return False
+        columns = {name: np.array([value], dtype=np.float64) for name, value in features.items()}
+        return self._enqueue(columns, np.array([primary_usd], dtype=np.float64), float(primary_ms))
+
+    def maybe_submit_batch(self, features: Dict[str, np.ndarray], primary_usd: np.ndarray,
+                           primary_ms: float) -> bool:
+        """
+        Batch (binary /predict): sample từng record với xác suất sample_rate, các record được chọn
+        đi chung 1 job (1 slot). primary_ms là latency trung bình / record của model chính.
+        """
+        if self.sample_rate <= 0.0:
+            return False
+        mask = np.random.random(len(primary_usd)) < self.sample_rate
+        if not mask.any():
+            return False
+        columns = {name: values[mask] for name, values in features.items()}
+        return self._enqueue(columns, np.asarray(primary_usd, dtype=np.float64)[mask], float(primary_ms))
+
+    def _enqueue(self, features: Dict[str, np.ndarray], primary_usd: np.ndarray, primary_ms: float) -> bool:
+        n = len(primary_usd)
+        if not self._slots.acquire(blocking=False):
+            self.dropped += n
+            return False
+        self.submitted += n
+        try:
+            self._executor.submit(self._score, features, primary_usd, primary_ms)
+        except RuntimeError:
+            # Executor đã shutdown
+            self._slots.release()
+            self.dropped += n
+            return False
+        return True
+
+    def _score(self, features: Dict[str, np.ndarray], primary_usd: np.ndarray, primary_ms: float):
+        try:
+            X_shadow = build_feature_matrix(features, self.feature_names)
+            start = time.perf_counter()
+            shadow_usd = self.backend.predict(X_shadow)
+            # Latency / record, cùng đơn vị với primary_ms
+            shadow_ms = (time.perf_counter() - start) * 1000.0 / len(primary_usd)
+            now = time.time()
+            records = b"".join(
+                struct.pack(RECORD_FORMAT, now, p, s, primary_ms, shadow_ms)
+                for p, s in zip(primary_usd.tolist(), shadow_usd.tolist())
+            )
+            with self._write_lock:
+                self._log_file.write(records)
+                self.logged += len(primary_usd)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Shadow predict failed: {e}")
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "logged": self.logged,
+            "errors": self.errors,
+            "backend": self.backend.describe(),
+            "log_path": self.log_path,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        self._log_file.close()
+
+
+def load_shadow_evaluator(model_path: str, input_columns: List[str], sample_rate: float, log_path: str,
+                          max_pending: int) -> Optional[ShadowEvaluator]:
+    """Load model shadow từ file pickle. Trả về None nếu không load được."""
+    if not os.path.exists(model_path):
+        print(f"⚠️ Shadow model not found at {model_path}, shadow mode disabled")
+        return None
+    try:
+        print(f"📥 Loading shadow model from: {model_path}")
+        with open(model_path, "rb") as f:
+            shadow_model = pickle.load(f)
+        evaluator = ShadowEvaluator(shadow_model, input_columns, sample_rate=sample_rate, log_path=log_path,
+                                    max_pending=max_pending)
+        print(f"✅ Shadow model loaded ({type(shadow_model).__name__}, {evaluator.backend.name} backend, "
+              f"sample rate {evaluator.sample_rate:.2f})")
+        return evaluator
+    except Exception as e:
+        print(f"⚠️ Failed to load shadow model: {e}, shadow mode disabled")
+        return None
+
+
+# ============================================
+# REPORT
+# ============================================
+def read_log(log_path: str) -> np.ndarray:
+    n_bytes = os.path.getsize(log_path)
+    # Bỏ record cuối nếu bị ghi dở
+    count = n_bytes // RECORD_SIZE
+    return np.fromfile(log_path, dtype=RECORD_DTYPE, count=count)
+
+
+def summarize_log(log_path: str) -> dict:
+    records = read_log(log_path)
+    if len(records) == 0:
+        return {"count": 0}
+    primary = records["primary_usd"].astype(np.float64)
+    shadow = records["shadow_usd"].astype(np.float64)
+    delta = shadow - primary
+    abs_delta = np.abs(delta)
+    rel_delta = abs_delta / np.maximum(np.abs(primary), 1e-9)
+
+    def latency(col):
+        values = records[col].astype(np.float64)
+        return {
+            "mean_ms": float(values.mean()),
+            "p50_ms": float(np.percentile(values, 50)),
+            "p95_ms": float(np.percentile(values, 95)),
+            "p99_ms": float(np.percentile(values, 99)),
+        }
+
+    return {
+        "count": int(len(records)),
+        "first_ts": float(records["ts"].min()),
+        "last_ts": float(records["ts"].max()),
+        "mean_delta_usd": float(delta.mean()),
+        "mean_abs_delta_usd": float(abs_delta.mean()),
+        "p50_abs_delta_usd": float(np.percentile(abs_delta, 50)),
+        "p95_abs_delta_usd": float(np.percentile(abs_delta, 95)),
+        "max_abs_delta_usd": float(abs_delta.max()),
+        "mean_rel_delta": float(rel_delta.mean()),
+        "within_5pct": float((rel_delta <= 0.05).mean()),
+        "primary_latency": latency("primary_ms"),
+        "shadow_latency": latency("shadow_ms"),
+    }
+
+
+def print_report(summary: dict):
+    print(f"\n{'='*60}")
+    print("🌓 SHADOW MODEL REPORT")
+    if summary["count"] == 0:
+        print("  No shadow records logged yet")
+        print(f"{'='*60}\n")
+        return
+    first = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(summary["first_ts"]))
+    last = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(summary["last_ts"]))
+    print(f"  Samples: {summary['count']} ({first} → {last})")
+    print(f"  Mean delta (shadow - primary): ${summary['mean_delta_usd']:+.2f}")
+    print(f"  Abs delta: mean ${summary['mean_abs_delta_usd']:.2f}, p50 ${summary['p50_abs_delta_usd']:.2f}, "
+          f"p95 ${summary['p95_abs_delta_usd']:.2f}, max ${summary['max_abs_delta_usd']:.2f}")
+    print(f"  Mean relative delta: {summary['mean_rel_delta']*100:.2f}% "
+          f"({summary['within_5pct']*100:.1f}% of samples within 5%)")
+    print("-" * 60)
+    print(f"  {'Latency':<10}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name in ("primary", "shadow"):
+        lat = summary[f"{name}_latency"]
+        print(f"  {name:<10}{lat['mean_ms']:>8.2f}ms{lat['p50_ms']:>8.2f}ms"
+              f"{lat['p95_ms']:>8.2f}ms{lat['p99_ms']:>8.2f}ms")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shadow model evaluation tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="Summarize divergence and latency from the shadow log")
+    report.add_argument("--log", default=os.environ.get("SHADOW_LOG_PATH", DEFAULT_LOG_PATH))
+    args = parser.parse_args()
+
+    if args.command == "report":
+        if not os.path.exists(args.log):
+            print(f"❌ Shadow log not found at {args.log}")
+            raise SystemExit(1)
+        print_report(summarize_log(args.log))